@@ -65,8 +65,8 @@ def main():
         bankroll=cfg["bankroll"],
     ))
 
-    (outdir/"bets_log.csv").write_text(bets_df.to_csv(index=False), encoding="utf-8")
-    (outdir/"summary.csv").write_text(summary_df.to_csv(index=False), encoding="utf-8")
+    bets_df.to_csv(outdir/"bets_log.csv", index=False)
+    summary_df.to_csv(outdir/"summary.csv", index=False)
     (outdir/f"params_cfg{cfg['cfg_id']}.json").write_text(json.dumps(cfg, indent=2), encoding="utf-8")
 
     md = write_summary_md(cfg, diagnostics, summary_df.iloc[0].to_dict())
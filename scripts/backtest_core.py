@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 """
-Core backtest utilities: transform, select, stake, simulate.
+Core backtest utilities: select, stake, simulate.
 Importable by backtest_all.py and matrix_backtest.py.
 """
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 @dataclass
@@ -18,73 +19,102 @@ class Config:
     kelly_scale: float = 0.5
     bankroll: float = 1000.0
 
-def _long_format(df: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    for _, r in df.iterrows():
-        for side in ("A","B"):
-            odds = r["odds_a"] if side == "A" else r["odds_b"]
-            row = {
-                "date": r["date"],
-                "player": r["player_a"] if side == "A" else r["player_b"],
-                "opp":    r["player_b"] if side == "A" else r["player_a"],
-                "side": side,
-                "odds": float(odds),
-                "model_prob": float(r["model_prob_a"] if side == "A" else r["model_prob_b"]),
-                "implied_prob": float(r["implied_prob_a"] if side == "A" else r["implied_prob_b"]),
-                "edge": float(r["edge_a"] if side == "A" else r["edge_b"]),
-                "winner": bool(r.get("winner", "X") == side),
-            }
-            rows.append(row)
-    return pd.DataFrame(rows)
+def select_signals(df: pd.DataFrame, bands: tuple[float,float], min_edge: float) -> pd.DataFrame:
+    """Best eligible side per match, straight from the wide (one row per match)
+    frame: both sides' edges are compared in place and only the winner is
+    gathered, so no per-side long frame is built. Ties go to side A."""
+    lo, hi = bands
+    n = len(df)
 
-def _match_key(row: pd.Series) -> str:
-    a, b = sorted([row["player"], row["opp"]])
-    return f"{row['date']}|{a} vs {b}"
+    def col(name):
+        return df[name].to_numpy(dtype=float)
 
-def select_signals(df_long: pd.DataFrame, bands: tuple[float,float], min_edge: float) -> pd.DataFrame:
-    lo, hi = bands
-    cand = df_long[(df_long["odds"] >= lo) & (df_long["odds"] <= hi) & (df_long["edge"] > min_edge)].copy()
-    cand["match"] = cand.apply(_match_key, axis=1)
+    oa, ob = col("odds_a"), col("odds_b")
+    ea, eb = col("edge_a"), col("edge_b")
+    ok_a = (oa >= lo) & (oa <= hi) & (ea > min_edge)
+    ok_b = (ob >= lo) & (ob <= hi) & (eb > min_edge)
+    pick_a = ok_a & (~ok_b | (ea >= eb))
+    keep = ok_a | ok_b
+    pick_a, rows = pick_a[keep], np.flatnonzero(keep)
+
+    def side(a, b):
+        return np.where(pick_a, a[rows], b[rows])
+
+    pa_name, pb_name = df["player_a"].to_numpy(), df["player_b"].to_numpy()
+    winner = df["winner"].to_numpy() if "winner" in df.columns else np.full(n, "X")
+    cand = pd.DataFrame({
+        "date": df["date"].to_numpy()[rows],
+        "player": side(pa_name, pb_name),
+        "opp": side(pb_name, pa_name),
+        "side": np.where(pick_a, "A", "B"),
+        "odds": side(oa, ob),
+        "model_prob": side(col("model_prob_a"), col("model_prob_b")),
+        "implied_prob": side(col("implied_prob_a"), col("implied_prob_b")),
+        "edge": side(ea, eb),
+    })
+    cand["winner"] = winner[rows] == cand["side"].to_numpy()
+    # "date|A vs B" with the two names in sorted order, built column-wise
+    player, opp = cand["player"], cand["opp"]
+    first = player <= opp
+    lo = player.where(first, opp)
+    hi = opp.where(first, player)
+    cand["match"] = cand["date"].astype(str) + "|" + lo + " vs " + hi
     best = cand.sort_values(["match","edge"], ascending=[True, False]).groupby("match").head(1).reset_index(drop=True)
     return best
 
-def kelly_stake(bankroll: float, odds: float, p: float, scale: float) -> float:
-    b = odds - 1.0
-    q = 1.0 - p
-    f_star = (b*p - q) / b if b != 0 else 0.0
-    return max(0.0, scale * f_star * bankroll)
+def kelly_stake(bankroll, odds, p, scale):
+    """Fractional Kelly stake; scalars or NumPy arrays of odds/p."""
+    b = np.asarray(odds, dtype=float) - 1.0
+    q = 1.0 - np.asarray(p, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f_star = np.where(b != 0, (b*p - q) / b, 0.0)
+    return np.maximum(0.0, scale * f_star * bankroll)
 
 def simulate(cfg: Config) -> tuple[pd.DataFrame, pd.DataFrame]:
     src = Path(cfg.dataset)
     if not src.exists():
         raise FileNotFoundError(f"Dataset not found: {src}")
-    raw = pd.read_csv(src)
-    long = _long_format(raw)
-    sigs = select_signals(long, cfg.bands, cfg.min_edge)
+    raw = pd.read_csv(src, memory_map=True)
+    sigs = select_signals(raw, cfg.bands, cfg.min_edge)
 
-    bankroll = float(cfg.bankroll)
-    bets = []
-    for _, s in sigs.iterrows():
-        stake = 0.0
-        if cfg.staking == "kelly":
-            stake = kelly_stake(bankroll, s["odds"], s["model_prob"], cfg.kelly_scale)
-        elif cfg.staking == "flat":
-            stake = min(0.02 * bankroll, bankroll)  # example flat 2%
+    # Each bet stakes a fixed fraction of the running bankroll, so the
+    # bankroll path is a cumulative product of (1 + fraction * return).
+    start = float(cfg.bankroll)
+    odds = sigs["odds"].to_numpy(dtype=float)
+    won = sigs["winner"].to_numpy(dtype=bool)
+    ret = np.where(won, odds - 1.0, -1.0)
+    if cfg.staking == "kelly":
+        fraction = kelly_stake(1.0, odds, sigs["model_prob"].to_numpy(dtype=float), cfg.kelly_scale)
+    elif cfg.staking == "flat":
+        fraction = np.full(len(sigs), 0.02)  # example flat 2%
+    else:
+        fraction = np.zeros(len(sigs))
+    growth = np.cumprod(1.0 + fraction * ret)
+    # a wiped-out bankroll places no further bets
+    bust = np.flatnonzero(growth <= 0)
+    if bust.size:
+        k = bust[0]
+        growth[k + 1:] = growth[k]
+        fraction[k + 1:] = 0.0
+    bankroll_after = start * growth
+    stake = np.where(fraction > 0, np.concatenate(([start], bankroll_after[:-1])) * fraction, 0.0)
+    pnl_arr = np.where(won, stake * (odds - 1.0), -stake)
+    bankroll = float(bankroll_after[-1]) if len(bankroll_after) else start
 
-        result = "win" if s["winner"] else "loss"
-        pnl = stake * (s["odds"] - 1.0) if result == "win" else -stake
-        bankroll += pnl
-        bets.append({
-            "date": s["date"], "match": s["match"], "pick": s["player"],
-            "odds": round(s["odds"],2), "edge": round(s["edge"],4),
-            "p_model": round(s["model_prob"],4), "stake": round(stake,2),
-            "result": result, "pnl": round(pnl,2), "bankroll_after": round(bankroll,2),
+    bets_df = pd.DataFrame()
+    if len(sigs):
+        bets_df = pd.DataFrame({
+            "date": sigs["date"], "match": sigs["match"], "pick": sigs["player"],
+            "odds": sigs["odds"].round(2), "edge": sigs["edge"].round(4),
+            "p_model": sigs["model_prob"].round(4), "stake": np.round(stake, 2),
+            "result": np.where(won, "win", "loss"), "pnl": np.round(pnl_arr, 2),
+            "bankroll_after": np.round(bankroll_after, 2),
         })
-
-    bets_df = pd.DataFrame(bets)
-    total_staked = float(round(bets_df["stake"].sum(), 2)) if len(bets_df) else 0.0
-    pnl = float(round(bets_df["pnl"].sum(), 2)) if len(bets_df) else 0.0
+    # totals from the unrounded arrays; rounding is for the CSV columns only
+    total_staked = float(stake.sum())
+    pnl = float(pnl_arr.sum())
     roi = float(round((pnl / total_staked), 4)) if total_staked > 0 else 0.0
+    total_staked, pnl = round(total_staked, 2), round(pnl, 2)
     summary = pd.DataFrame([{
         "cfg_id": cfg.cfg_id, "n_bets": int(len(bets_df)),
         "total_staked": total_staked, "pnl": pnl, "roi": roi,
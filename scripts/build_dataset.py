@@ -21,6 +21,7 @@ Logic:
 import csv
 import os
 from datetime import date, datetime, timezone
+from functools import lru_cache
 from glob import glob
 from pathlib import Path
 from typing import List, Dict, Tuple
@@ -52,7 +53,9 @@ def iprob(odds):
     except Exception:
         return None
 
+@lru_cache(maxsize=None)
 def norm(x: str) -> str:
+    # names/tournaments repeat across every odds file; normalize each once
     return (x or "").strip().lower()
 
 def key4(t, a, b, d) -> Tuple[str, str, str, str]:
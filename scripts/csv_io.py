@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Column-selective CSV reading shared by the backtest/report scripts.
+Uses pandas' multithreaded pyarrow engine for large files when pyarrow is
+installed, the C engine otherwise.
+"""
+from __future__ import annotations
+import csv
+import os
+from typing import Callable
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (multithreaded CSV parser for pandas)
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+# below this the arrow engine's thread start-up costs more than it saves
+ARROW_MIN_BYTES = 256 * 1024
+
+def read_columns(path, wanted: Callable[[str], bool], dtype: dict | None = None) -> pd.DataFrame:
+    """Read only the columns for which wanted(name) is true; dtype entries for
+    columns the file does not have are ignored."""
+    # the arrow engine wants explicit column names, so peek at the header once
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        cols = [c for c in next(csv.reader(f), []) if wanted(c)]
+    dtype = {c: t for c, t in (dtype or {}).items() if c in cols}
+    if HAVE_ARROW and os.path.getsize(path) >= ARROW_MIN_BYTES:
+        return pd.read_csv(path, engine="pyarrow", usecols=cols, dtype=dtype)
+    return pd.read_csv(path, usecols=cols, dtype=dtype, low_memory=False, memory_map=True)
@@ -18,11 +18,15 @@ Purpose:
 """
 
 from __future__ import annotations
-import csv, json, sys
+import csv, sys
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Dict, List, Tuple, Optional
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from json_io import dumps, write_json  # noqa: E402
+
 ROOT     = Path(__file__).resolve().parents[1]
 OUT_DIR  = ROOT / "outputs"
 RAW_DIR  = ROOT / "data" / "raw"
@@ -42,18 +46,6 @@ def read_rows(path: Path) -> List[Dict[str, str]]:
     with path.open("r", encoding="utf-8") as f:
         return list(csv.DictReader(f))
 
-def write_rows(path: Path, rows: List[Dict[str, str]], header: List[str]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=header)
-        w.writeheader()
-        for r in rows:
-            w.writerow({k: r.get(k, "") for k in header})
-
-def write_json(path: Path, obj) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(obj, indent=2))
-
 def num(x) -> float:
     try: return float(x)
     except: return 0.0
@@ -74,19 +66,23 @@ ALIASES = {
     "plb":  ["player_b","away","playerB","B_name","b_player"],
 }
 
-def find_col(header: List[str], want: str) -> Optional[str]:
-    lower = {h.lower(): h for h in header}
+def find_col(lower: Dict[str, str], want: str) -> Optional[str]:
+    """lower: {header.lower(): header}, built once per file."""
     for alias in ALIASES[want]:
-        if alias.lower() in lower:
-            return lower[alias.lower()]
+        hit = lower.get(alias.lower())
+        if hit is not None:
+            return hit
     return None
 
+PREVIEW_ROWS = 20
+
 def normalize_prob_enriched() -> Tuple[List[Dict[str,str]], Dict]:
     """
-    Returns (normalized_rows, diagnostics)
+    Returns (preview_rows, diagnostics)
     - Reads OUT_DIR/prob_enriched.csv or RAW_DIR/vigfree_matches.csv
     - Ensures oa, ob, pa, pb columns exist (duplicated from aliases)
-    - Writes normalized back to OUT_DIR/prob_enriched.csv
+    - Streams normalized rows back to OUT_DIR/prob_enriched.csv;
+      only the first PREVIEW_ROWS are kept in memory for the report
     """
     srcs = [OUT_DIR / "prob_enriched.csv", RAW_DIR / "vigfree_matches.csv"]
     src: Optional[Path] = None
@@ -107,62 +103,68 @@ def normalize_prob_enriched() -> Tuple[List[Dict[str,str]], Dict]:
         diags["notes"].append("No source file found.")
         return [], diags
 
-    rows = read_rows(src)
-    diags["total_rows"] = len(rows)
-    if not rows:
+    dst = OUT_DIR / "prob_enriched.csv"
+    tmp = dst.with_suffix(".csv.tmp")  # src may be dst, so never write in place
+    dst.parent.mkdir(parents=True, exist_ok=True)
+
+    preview: List[Dict[str,str]] = []
+    with src.open("r", encoding="utf-8") as fin:
+        reader = csv.DictReader(fin)
+        header = list(reader.fieldnames or [])
+        lower = {h.lower(): h for h in header}
+        col_oa = find_col(lower, "oa")
+        col_ob = find_col(lower, "ob")
+        col_pa = find_col(lower, "pa")
+        col_pb = find_col(lower, "pb")
+
+        # Decide final header: original header + canonical columns (dedup)
+        final_header = list(header)
+        for k in ["oa","ob","pa","pb"]:
+            if k not in final_header:
+                final_header.append(k)
+
+        with tmp.open("w", newline="", encoding="utf-8") as fout:
+            w = csv.DictWriter(fout, fieldnames=final_header, extrasaction="ignore")
+            w.writeheader()
+            for r in reader:
+                diags["total_rows"] += 1
+                oa = r.get(col_oa) if col_oa else None
+                ob = r.get(col_ob) if col_ob else None
+                pa = r.get(col_pa) if col_pa else None
+                pb = r.get(col_pb) if col_pb else None
+
+                valid = True
+                for v in (oa, ob, pa, pb):
+                    try:
+                        if v is None: valid = False
+                        else: _ = float(v)
+                    except Exception:
+                        valid = False
+
+                if not valid:
+                    diags["skipped_missing"] += 1
+                    continue
+
+                # duplicate original row and add canonical columns
+                out = dict(r)
+                out["oa"] = oa
+                out["ob"] = ob
+                out["pa"] = pa
+                out["pb"] = pb
+                w.writerow(out)
+                diags["usable_rows"] += 1
+                if len(preview) < PREVIEW_ROWS:
+                    preview.append(out)
+
+    if diags["total_rows"] == 0:
+        tmp.unlink()
         diags["notes"].append("Source has header only or zero rows.")
         return [], diags
 
-    header = list(rows[0].keys())
-    col_oa = find_col(header, "oa")
-    col_ob = find_col(header, "ob")
-    col_pa = find_col(header, "pa")
-    col_pb = find_col(header, "pb")
-
-    # Build normalized rows (duplicate to canonical names)
-    normalized: List[Dict[str,str]] = []
-    for r in rows:
-        oa = r.get(col_oa) if col_oa else None
-        ob = r.get(col_ob) if col_ob else None
-        pa = r.get(col_pa) if col_pa else None
-        pb = r.get(col_pb) if col_pb else None
-
-        valid = True
-        for v in (oa, ob, pa, pb):
-            try:
-                if v is None: valid = False
-                else: _ = float(v)
-            except Exception:
-                valid = False
-
-        if not valid:
-            diags["skipped_missing"] += 1
-            continue
-
-        # duplicate original row and add canonical columns
-        out = dict(r)
-        out["oa"] = oa
-        out["ob"] = ob
-        out["pa"] = pa
-        out["pb"] = pb
-        normalized.append(out)
-
-    diags["usable_rows"] = len(normalized)
-
-    # Decide final header: original header + canonical columns (dedup)
-    final_header = list(header)
-    for k in ["oa","ob","pa","pb"]:
-        if k not in final_header:
-            final_header.append(k)
-
-    # Overwrite outputs/prob_enriched.csv with normalized data
-    if normalized:
-        write_rows(OUT_DIR / "prob_enriched.csv", normalized, final_header)
-    else:
-        # still write a header so downstream steps don't crash
-        write_rows(OUT_DIR / "prob_enriched.csv", [], final_header)
-
-    return normalized, diags
+    # Overwrite outputs/prob_enriched.csv with normalized data (header-only
+    # if nothing was usable, so downstream steps don't crash)
+    tmp.replace(dst)
+    return preview, diags
 
 # ------------------------------------------------------------
 # Report rendering
@@ -204,7 +206,7 @@ def render_preview_table(rows: List[Dict[str,str]]) -> str:
         if c in rows[0]: cols.append(c)
     head = "".join(f"<th>{c}</th>" for c in cols)
     body = []
-    for r in rows[:20]:
+    for r in rows[:PREVIEW_ROWS]:
         tds = "".join(f"<td>{r.get(c,'')}</td>" for c in cols)
         body.append(f"<tr>{tds}</tr>")
     return f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(body)}</tbody></table>"
@@ -216,12 +218,12 @@ def build_html(summary_rows: List[Dict[str,str]], winner: Optional[Dict], normal
         cfg = winner["cfg_id"]
         win_html = f"""
         <h3>Recommended Config (cfg {cfg})</h3>
-        <pre>{json.dumps(winner, indent=2)}</pre>
+        <pre>{dumps(winner)}</pre>
         <p>Params: <code>results/backtests/params_cfg{cfg}.json</code></p>
         <p>Picks:  <code>results/backtests/logs/picks_cfg{cfg}.csv</code></p>
         """
 
-    diag_block = f"<pre>{json.dumps(diags, indent=2)}</pre>"
+    diag_block = f"<pre>{dumps(diags)}</pre>"
 
     html = f"""<!doctype html>
 <html><head>
@@ -260,7 +262,7 @@ def build_html(summary_rows: List[Dict[str,str]], winner: Optional[Dict], normal
 
 def main():
     # 1) Normalize/ensure oa,ob,pa,pb
-    normalized_rows, diags = normalize_prob_enriched()
+    preview_rows, diags = normalize_prob_enriched()
     write_json(RES_DIR / "_diagnostics.json", diags)
 
     # 2) Load summary if any
@@ -269,10 +271,10 @@ def main():
 
     # 3) Render HTML
     DOCS_DIR.mkdir(parents=True, exist_ok=True)
-    html = build_html(summary, winner, normalized_rows, diags)
+    html = build_html(summary, winner, preview_rows, diags)
     (DOCS_DIR / "index.html").write_text(html, encoding="utf-8")
 
-    print(f"[report] normalized_rows={len(normalized_rows)} | summary_rows={len(summary)}")
+    print(f"[report] normalized_rows={diags['usable_rows']} | summary_rows={len(summary)}")
     print(f"[report] wrote {DOCS_DIR/'index.html'}")
 
 if __name__ == "__main__":
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+JSON writing shared by the pipeline and report scripts; uses orjson when
+installed, the stdlib json module otherwise.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+
+try:
+    import orjson  # optional C serializer
+except ImportError:
+    orjson = None
+
+def dumps(obj) -> str:
+    """Pretty JSON (indent=2); uses orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2)
+
+def write_json(path: Path, obj, compact: bool = True) -> None:
+    """compact=True for machine-read files; pretty only when asked."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not compact:
+        path.write_text(dumps(obj))
+    elif orjson is not None:
+        path.write_bytes(orjson.dumps(obj))
+    else:
+        path.write_text(json.dumps(obj, separators=(",", ":")))
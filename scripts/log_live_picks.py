@@ -9,17 +9,60 @@ Usage:
 """
 
 import argparse
+import csv
+import io
 import os
 import sys
-import pandas as pd
+from datetime import datetime, timezone
 
-def _safe_read_csv(path):
-    if not os.path.isfile(path):
-        return pd.DataFrame()
+def _read_rows(path):
+    """(header, rows-as-dicts); stdlib only, picks files are tiny."""
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return [], []
     try:
-        return pd.read_csv(path)
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            rd = csv.DictReader(f)
+            return list(rd.fieldnames or []), list(rd)
     except Exception:
-        return pd.DataFrame()
+        return [], []
+
+def _log_header(path):
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return []
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+def _to_float(x):
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return None
+
+def _key(values):
+    """Dedupe key: numbers compared by value ("2.10" == "2.1", as the log's
+    older pandas writer stored them), everything else as text."""
+    out = []
+    for v in values:
+        f = _to_float(v)
+        out.append(repr(f) if f is not None else str(v))
+    return tuple(out)
+
+def _read_log_keys(path, key_cols):
+    """Set of normalized key tuples already in the trade log."""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        rd = csv.reader(f)
+        header = next(rd, [])
+        idx = [header.index(c) for c in key_cols]
+        return {_key(row[i] if i < len(row) else "" for i in idx) for row in rd if row}
+
+def _write_rows_atomic(path, fieldnames, rows):
+    """Full rewrite via temp file + os.replace; readers never see a partial log."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w.writeheader()
+        w.writerows(rows)
+    os.replace(tmp, path)
 
 def main():
     ap = argparse.ArgumentParser()
@@ -34,17 +77,16 @@ def main():
     args = ap.parse_args()
 
     os.makedirs(args.state_dir, exist_ok=True)
-    picks = _safe_read_csv(args.picks)
+    header, picks = _read_rows(args.picks)
 
-    if picks.empty or "match_id" not in picks.columns:
+    if not picks or "match_id" not in header:
         print(f"[log_live_picks] no picks to log (file missing/empty: {args.picks}).")
         sys.exit(0)
 
     # Heuristic: explain WHY no rows survive (if filters upstream left nothing)
-    shown = picks.shape[0]
-    if "edge" in picks.columns:
-        viable = picks[picks["edge"].astype(float) > 0]
-        if viable.empty:
+    shown = len(picks)
+    if "edge" in header:
+        if not any((_to_float(r.get("edge")) or 0.0) > 0 for r in picks):
             min_edge = os.environ.get("MIN_EDGE", "unknown")
             print(f"[log_live_picks] {shown} rows present but none pass edge > 0 "
                   f"(engine min_edge={min_edge}). No log entry written.")
@@ -52,37 +94,54 @@ def main():
 
     # Minimal trade record (don’t duplicate if already logged)
     log_path = os.path.join(args.state_dir, "trade_log.csv")
-    existing = _safe_read_csv(log_path)
+    log_header = _log_header(log_path)
 
     cols = ["ts","match_id","selection","odds","p","edge","stake_eur"]
-    out = picks.copy()
     # Add ts if missing
-    if "ts" not in out.columns:
-        out["ts"] = pd.Timestamp.utcnow().strftime("%Y-%m-%d %H:%M")
+    if "ts" not in header:
+        ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+        for r in picks:
+            r["ts"] = ts
+        header.append("ts")
 
-    if "stake_eur" not in out.columns:
+    if "stake_eur" not in header:
         # simple constant stake respecting max-stake-eur and cap
-        out["stake_eur"] = min(args.max_stake_eur, args.stake_cap)
+        stake = min(args.max_stake_eur, args.stake_cap)
+        for r in picks:
+            r["stake_eur"] = stake
+        header.append("stake_eur")
 
-    out = out[[c for c in cols if c in out.columns]]
-    if out.empty:
+    out_cols = [c for c in cols if c in header]
+    out = [{c: r.get(c, "") for c in out_cols} for r in picks]
+    if not out:
         print("[log_live_picks] picks present but required columns missing; nothing logged.")
         sys.exit(0)
 
-    # Deduplicate by (ts, match_id, selection, odds)
-    if not existing.empty:
-        key_cols = [c for c in ["ts","match_id","selection","odds"] if c in out.columns and c in existing.columns]
-        if key_cols:
-            before = len(out)
-            merged = out.merge(existing[key_cols].drop_duplicates(), how="left", indicator=True, on=key_cols)
-            out = merged[merged["_merge"] == "left_only"].drop(columns=["_merge"])
-            out = out[[c for c in cols if c in out.columns]]
-            dropped = before - len(out)
-            if dropped > 0:
-                print(f"[log_live_picks] skipped {dropped} duplicate rows.")
-
-    final = pd.concat([existing, out], ignore_index=True) if not existing.empty else out
-    final.to_csv(log_path, index=False)
+    # Deduplicate by (ts, match_id, selection, odds); only the key columns
+    # of the existing log are read
+    key_cols = [c for c in ["ts","match_id","selection","odds"] if c in out_cols and c in log_header]
+    if key_cols:
+        seen = _read_log_keys(log_path, key_cols)
+        before = len(out)
+        out = [r for r in out if _key(r[c] for c in key_cols) not in seen]
+        dropped = before - len(out)
+        if dropped > 0:
+            print(f"[log_live_picks] skipped {dropped} duplicate rows.")
+
+    if not log_header:
+        _write_rows_atomic(log_path, out_cols, out)
+    elif set(out_cols) <= set(log_header):
+        # append-only: new rows laid out in the log's own column order,
+        # emitted with a single write() so a killed run can't leave half a row
+        buf = io.StringIO()
+        csv.DictWriter(buf, fieldnames=log_header).writerows(out)
+        with open(log_path, "a", newline="", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+    else:
+        # log predates one of our columns; rewrite once with the wider header
+        _, existing = _read_rows(log_path)
+        wide = log_header + [c for c in out_cols if c not in log_header]
+        _write_rows_atomic(log_path, wide, existing + out)
     print(f"[log_live_picks] appended {len(out)} row(s) to {log_path}")
 
 if __name__ == "__main__":
@@ -1,20 +1,33 @@
 #!/usr/bin/env python3
-import os, csv
+import os, csv, hashlib, heapq, time
+from collections import deque
 from pathlib import Path
-from datetime import datetime
+from string import Template
 
 STATE_DIR = os.environ.get("STATE_DIR",".state")
 DOCS = os.environ.get("DOCS_DIR","docs")
 HTML = os.path.join(DOCS,"index.html")
+STAMP = os.path.join(DOCS,".dashboard.stamp")
 PICKS = os.environ.get("PICKS_FILE","picks_live.csv")
 TRADE_LOG = os.path.join(STATE_DIR,"trade_log.csv")
 SETTLED = os.path.join(STATE_DIR,"settled_trades.csv")
 GOAL = float(os.environ.get("EDGE_GOAL","8.0") or 8.0)
 
-def read_csv(p):
+PICK_COLS = ["edge","kelly_stake","odds","implied_p","match","selection"]
+TRADE_COLS = ["ts","match","selection","odds","edge","stake"]
+SETTLED_COLS = TRADE_COLS + ["result","pnl","clv"]
+
+def read_csv(p, cols=None, tail=None):
+    """Rows as dicts; with `cols`, only those columns are materialized;
+    with `tail`, only the last `tail` rows are kept while streaming."""
     try:
         if (not os.path.isfile(p)) or os.path.getsize(p)==0: return []
-        return list(csv.DictReader(open(p)))
+        with open(p, newline="") as f:
+            if cols is None: return list(csv.DictReader(f))
+            rd=csv.reader(f); header=next(rd, [])
+            idx=[(c, header.index(c)) for c in cols if c in header]
+            rows=deque((row for row in rd if row), maxlen=tail)
+            return [{c: row[i] for c,i in idx if i<len(row)} for row in rows]
     except: return []
 
 def fnum(x):
@@ -24,15 +37,29 @@ def fnum(x):
         return float(s)
     except: return None
 
-def td(s): return f"<td>{s}</td>"
+CSS="""
+    body{font-family:system-ui,Segoe UI,Arial,sans-serif;max-width:950px;margin:2rem auto;padding:0 1rem}
+    table{border-collapse:collapse;width:100%;margin:.5rem 0}
+    th,td{border:1px solid #ddd;padding:6px 8px;font-size:14px}
+    th{background:#f6f6f6;text-align:left}
+    .progress{font-family:monospace}
+    """
+# static shell with CSS and goal filled in once; main() only substitutes per-run values
+PAGE=Template(Template("""<!doctype html><meta charset="utf-8"><title>Tennis Engine — Dashboard</title>
+    <style>$css</style>
+    <h1>Tennis Engine — Run Summary <span style='color:#666;font-size:14px'>($$now)</span></h1>
+    <p><b>Total Edge:</b> $$total_pts pts / Goal $goal
+       <span class="progress"> $$bar $${prog}%</span> • <b>Total Kelly:</b> €$$total_kelly</p>
+    <h2>🔥 Top Picks by Edge</h2>$$top_table
+    <h2>Last 20 Trades</h2>$$trades_table
+    <h2>Last 20 Settlements</h2>$$settled_table
+    """).substitute(css=CSS, goal=f"{GOAL:.2f}"))
 
 def table(rows, cols):
     if not rows: return "<i>(none)</i>"
     head="<tr>"+ "".join(f"<th>{c}</th>" for c in cols)+"</tr>"
-    body=[]
-    for r in rows:
-        body.append("<tr>"+ "".join(td(r.get(c,"")) for c in cols)+"</tr>")
-    return f"<table>{head}{''.join(body)}</table>"
+    body="".join("<tr><td>"+"</td><td>".join(str(r.get(c,"")) for c in cols)+"</td></tr>" for r in rows)
+    return f"<table>{head}{body}</table>"
 
 def bucket(e):
     try:
@@ -43,8 +70,25 @@ def bucket(e):
     except: pass
     return "⚪️"
 
+def inputs_signature():
+    """Hash of input bytes (+goal); equal signature => same dashboard.
+    Content, not mtime: a fresh CI checkout touches every file."""
+    h=hashlib.blake2b(repr(GOAL).encode(), digest_size=16)
+    for p in (PICKS, TRADE_LOG, SETTLED):
+        h.update(p.encode())
+        try:
+            with open(p,"rb") as f: h.update(f.read())
+        except OSError: h.update(b"-")
+    return h.hexdigest()
+
 def main():
-    picks=read_csv(PICKS); trades=read_csv(TRADE_LOG); settled=read_csv(SETTLED)
+    sig=inputs_signature()
+    try:
+        if os.path.isfile(HTML) and Path(STAMP).read_text().strip()==sig:
+            print(f"Dashboard inputs unchanged; keeping {HTML}")
+            return
+    except OSError: pass
+    picks=read_csv(PICKS, PICK_COLS); trades=read_csv(TRADE_LOG, TRADE_COLS, tail=20); settled=read_csv(SETTLED, SETTLED_COLS, tail=20)
     total_edge=0.0; total_kelly=0.0; top=[]
     for r in picks:
         e=fnum(r.get("edge")); k=fnum(r.get("kelly_stake")); o=fnum(r.get("odds")); ip=fnum(r.get("implied_p"))
@@ -58,28 +102,23 @@ def main():
           "edge": f"{e:.4f}" if e is not None else "",
           "kelly€": f"{k:.2f}" if k else "",
         })
-    top=sorted(top, key=lambda x: float(x.get("edge") or -1e9), reverse=True)[:20]
+    top=heapq.nlargest(20, top, key=lambda x: float(x.get("edge") or -1e9))
     total_pts=total_edge*100; prog=int(max(0,min(100,(total_pts/GOAL)*100))) if GOAL>0 else 0
     bar="█"*(prog//10)+"░"*(10-prog//10)
-    now=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%SZ")
-    css="""
-    body{font-family:system-ui,Segoe UI,Arial,sans-serif;max-width:950px;margin:2rem auto;padding:0 1rem}
-    table{border-collapse:collapse;width:100%;margin:.5rem 0}
-    th,td{border:1px solid #ddd;padding:6px 8px;font-size:14px}
-    th{background:#f6f6f6;text-align:left}
-    .progress{font-family:monospace}
-    """
-    html=f"""<!doctype html><meta charset="utf-8"><title>Tennis Engine — Dashboard</title>
-    <style>{css}</style>
-    <h1>Tennis Engine — Run Summary <span style='color:#666;font-size:14px'>({now})</span></h1>
-    <p><b>Total Edge:</b> {total_pts:.2f} pts / Goal {GOAL:.2f}
-       <span class="progress"> {bar} {prog}%</span> • <b>Total Kelly:</b> €{total_kelly:.2f}</p>
-    <h2>🔥 Top Picks by Edge</h2>{table(top,["🏷","match","selection","odds","implied_p","edge","kelly€"])}
-    <h2>Last 20 Trades</h2>{table(trades[-20:],["ts","match","selection","odds","edge","stake"])}
-    <h2>Last 20 Settlements</h2>{table(settled[-20:],["ts","match","selection","odds","edge","stake","result","pnl","clv"])}
-    """
+    now=time.strftime("%Y-%m-%d %H:%M:%SZ", time.gmtime())
+    html=PAGE.substitute(
+        now=now, total_pts=f"{total_pts:.2f}", bar=bar, prog=prog, total_kelly=f"{total_kelly:.2f}",
+        top_table=table(top,["🏷","match","selection","odds","implied_p","edge","kelly€"]),
+        trades_table=table(trades,TRADE_COLS),
+        settled_table=table(settled,SETTLED_COLS),
+    )
     Path(DOCS).mkdir(parents=True, exist_ok=True)
-    Path(HTML).write_text(html, encoding="utf-8")
+    # write-then-rename so an interrupted run never leaves a half page (or a
+    # stamp pointing at one)
+    tmp=HTML+".tmp"
+    Path(tmp).write_text(html, encoding="utf-8")
+    os.replace(tmp, HTML)
+    Path(STAMP).write_text(sig)
     print(f"Wrote dashboard -> {HTML}")
 
 if __name__=="__main__": main()
@@ -9,7 +9,13 @@ Merge engine summary + matrix backtest into one Markdown:
 Robust to missing files/columns.
 """
 from __future__ import annotations
-import argparse, csv, json, math, pathlib, statistics as stats
+import argparse, csv, json, math, pathlib, statistics as stats, sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+
+from csv_io import read_columns  # noqa: E402
 
 def read_text(path: str) -> str | None:
     p = pathlib.Path(path)
@@ -29,7 +35,8 @@ def read_json(path: str) -> dict:
 def read_csv(path: str) -> list[dict]:
     p = pathlib.Path(path)
     if p.exists() and p.stat().st_size > 0:
-        with p.open(newline="", encoding="utf-8") as f:
+        # 1 MiB buffer: far fewer read() syscalls on large results.csv files
+        with p.open(newline="", encoding="utf-8", buffering=1 << 20) as f:
             return list(csv.DictReader(f))
     return []
 
@@ -49,46 +56,50 @@ def md_table(headers, rows):
         out.append("| " + " | ".join(r) + " |")
     return "\n".join(out)
 
-def bankroll_stats(rows: list[dict]):
+def is_bankroll_after(col: str) -> bool:
+    c = col.lower()
+    return c.startswith("bankroll") and "after" in c
+
+def read_bankroll_frame(path: str) -> pd.DataFrame:
+    """Only the step index and bankroll-after columns of results.csv."""
+    p = pathlib.Path(path)
+    if not (p.exists() and p.stat().st_size > 0):
+        return pd.DataFrame()
+    df = read_columns(p, lambda c: c == "row_idx" or is_bankroll_after(c))
+    if df.columns.empty:
+        # neither column present: keep the row count so the curve still
+        # renders its steps with "-" bankrolls
+        df = pd.DataFrame(index=pd.RangeIndex(len(pd.read_csv(p, usecols=[0]))))
+    return df
+
+def bankroll_stats(df: pd.DataFrame):
     """Return sampled curve rows + final BR + max drawdown."""
-    if not rows: 
+    if not len(df):
         return [], None, None
-    # column fallback
+    # column fallback (legacy names like Bankroll_After)
     br_after_col = "bankroll_after"
-    if br_after_col not in rows[0]:
-        # legacy name fallback
-        for k in rows[0].keys():
-            if k.lower().startswith("bankroll") and "after" in k.lower():
-                br_after_col = k
-                break
+    if br_after_col not in df.columns:
+        br_after_col = next((c for c in df.columns if is_bankroll_after(c)), None)
+    n = len(df)
     # in case there is an index/step
-    idx_col = "row_idx" if "row_idx" in rows[0] else None
-    curve = []
-    for i, r in enumerate(rows):
-        step = int(r.get(idx_col, i))
-        try:
-            br = float(r.get(br_after_col, "nan"))
-        except Exception:
-            br = float("nan")
-        curve.append((step, br))
+    steps = df["row_idx"].astype(int).to_numpy() if "row_idx" in df.columns else np.arange(n)
+    br = (pd.to_numeric(df[br_after_col], errors="coerce").to_numpy(dtype=float)
+          if br_after_col else np.full(n, np.nan))
     # sort by step
-    curve.sort(key=lambda x: x[0])
+    order = np.argsort(steps, kind="stable")
+    steps, br = steps[order], br[order]
     # sample ~10 points
-    n = len(curve)
     k = max(1, n // 10)
-    sampled = [(s, b) for i,(s,b) in enumerate(curve) if i % k == 0]
-    if sampled[-1][0] != curve[-1][0]:
-        sampled.append(curve[-1])
-    # max drawdown
-    max_peak = -float("inf")
-    max_dd = 0.0
-    for _, br in curve:
-        if not math.isnan(br):
-            max_peak = max(max_peak, br) if max_peak != -float("inf") else br
-            if max_peak != 0 and not math.isnan(max_peak):
-                dd = (max_peak - br) / max_peak
-                if dd > max_dd: max_dd = dd
-    final_br = curve[-1][1] if curve else None
+    idx = list(range(0, n, k))
+    if steps[idx[-1]] != steps[-1]:
+        idx.append(n - 1)
+    sampled = [(int(steps[i]), float(br[i])) for i in idx]
+    # max drawdown: running peak (NaN-skipping) in one accumulate pass
+    peak = np.fmax.accumulate(br)
+    ok = ~np.isnan(br) & (peak != 0)
+    dd = (peak[ok] - br[ok]) / peak[ok]
+    max_dd = max(0.0, float(dd.max())) if dd.size else 0.0
+    final_br = float(br[-1])
     return sampled, final_br, max_dd
 
 def main():
@@ -150,8 +161,8 @@ def main():
 
     # 4) Bankroll curve + max drawdown
     parts.append("\n## Bankroll curve (sampled)")
-    res = read_csv(args.matrix_results)
-    if res:
+    res = read_bankroll_frame(args.matrix_results)
+    if len(res):
         sampled, final_br, max_dd = bankroll_stats(res)
         if sampled:
             rows = [[str(s), fmt(br)] for s,br in sampled]
@@ -9,13 +9,53 @@ Usage:
   python scripts/notify_picks.py --live-outdir live_results --backtest-outdir results --min-rows 1
 """
 import os, argparse, pandas as pd, textwrap, json, time
+from collections import OrderedDict
+from functools import reduce
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # optional C serializer
+except ImportError:
+    orjson = None
+
+# one pooled session for all posts so TLS/connection setup is paid once;
+# only failures where the message was certainly not delivered are retried
+# (connect errors and 429); a read timeout or 5xx may follow a delivered post,
+# so retrying those would send duplicate alerts
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=Retry(
+    total=3, connect=3, read=0, status=3, backoff_factor=0.3, status_forcelist=[429],
+    allowed_methods=frozenset({"POST"}), raise_on_status=False)))
+
+# per-message caps, kept under Telegram's 4096 and Discord's 2000 chars
+TELEGRAM_LIMIT = 4000
+DISCORD_LIMIT = 1900
+
+# parsed frames keyed by (path, mtime_ns, size); a rewritten file gets a new key
+_CSV_CACHE: OrderedDict = OrderedDict()
+_CSV_CACHE_MAX = 8
 
 def read_csv_safe(path):
+    """Read a CSV, or an empty frame if missing/unreadable. Results are
+    memoized per file version, so callers must not modify the frame."""
     try:
         if os.path.isfile(path):
+            st = os.stat(path)
+            # empty/near-empty file: nothing to parse, skip pandas entirely
+            if st.st_size < 2:
+                return pd.DataFrame()
+            key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+            if key in _CSV_CACHE:
+                _CSV_CACHE.move_to_end(key)
+                return _CSV_CACHE[key]
             df = pd.read_csv(path)
-            return df if not df.empty else pd.DataFrame()
+            df = df if not df.empty else pd.DataFrame()
+            _CSV_CACHE[key] = df
+            if len(_CSV_CACHE) > _CSV_CACHE_MAX:
+                _CSV_CACHE.popitem(last=False)
+            return df
     except Exception as e:
         print(f"[warn] failed reading {path}: {e}")
     return pd.DataFrame()
@@ -24,58 +64,86 @@ def fmt_block(df, title, topn=8):
     if df.empty:
         return f"*{title}*\nNo picks.\n"
     cols = [c for c in ["match_id","sel","player_a","player_b","odds","p","edge","price","p_model"] if c in df.columns]
-    df2 = df.copy()
+    # only the shown rows/columns are copied (and the input stays untouched)
+    df2 = df[cols].head(topn).copy()
     if "edge" in df2.columns:
         df2["edge"] = (df2["edge"]*100).round(1)
     if "p" in df2.columns:
         df2["p"] = (df2["p"]*100).round(1)
-    df2 = df2[cols].head(topn)
-    lines = [f"*{title}* (top {len(df2)})"]
-    for _, r in df2.iterrows():
-        parts = []
-        if "match_id" in r: parts.append(f"`{r['match_id']}`")
-        if "player_a" in r and "player_b" in r:
-            parts.append(f"{r['player_a']} vs {r['player_b']}")
-        if "sel" in r:
-            parts.append(f"Pick: {r['sel']}")
-        if "odds" in r:
-            parts.append(f"odds {r['odds']}")
-        if "p" in r:
-            parts.append(f"p {r['p']}%")
-        if "edge" in r:
-            parts.append(f"edge {r['edge']}%")
-        lines.append("• " + " | ".join(parts))
+    # one formatted Series per field, joined column-wise into the lines
+    parts = []
+    if "match_id" in df2: parts.append("`" + df2["match_id"].astype(str) + "`")
+    if "player_a" in df2 and "player_b" in df2:
+        parts.append(df2["player_a"].astype(str) + " vs " + df2["player_b"].astype(str))
+    if "sel" in df2:
+        parts.append("Pick: " + df2["sel"].astype(str))
+    if "odds" in df2:
+        parts.append("odds " + df2["odds"].astype(str))
+    if "p" in df2:
+        parts.append("p " + df2["p"].astype(str) + "%")
+    if "edge" in df2:
+        parts.append("edge " + df2["edge"].astype(str) + "%")
+    body = reduce(lambda a, b: a.str.cat(b, sep=" | "), parts) if parts else pd.Series("", index=df2.index)
+    lines = [f"*{title}* (top {len(df2)})"] + ("• " + body).tolist()
     return "\n".join(lines) + "\n"
 
+def split_message(text, limit):
+    """Split text into chunks of at most `limit` chars, on line boundaries
+    where possible."""
+    chunks, cur = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if cur:
+                chunks.append(cur)
+                cur = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if len(cur) + len(line) > limit:
+            chunks.append(cur)
+            cur = ""
+        cur += line
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+def post_json(url, payload):
+    """POST a JSON body over the pooled session (serialized with orjson when
+    installed)."""
+    if orjson is not None:
+        return _SESSION.post(url, data=orjson.dumps(payload),
+                             headers={"Content-Type": "application/json"}, timeout=15)
+    return _SESSION.post(url, json=payload, timeout=15)
+
 def send_telegram(text):
     tok = os.getenv("TELEGRAM_BOT_TOKEN")
     chat = os.getenv("TELEGRAM_CHAT_ID")
     if not tok or not chat:
         return False
     url = f"https://api.telegram.org/bot{tok}/sendMessage"
-    payload = {"chat_id": chat, "text": text, "parse_mode": "Markdown"}
-    r = requests.post(url, json=payload, timeout=15)
-    print("[telegram]", r.status_code, r.text[:200])
-    return r.ok
+    ok = True
+    for chunk in split_message(text, TELEGRAM_LIMIT):
+        payload = {"chat_id": chat, "text": chunk, "parse_mode": "Markdown"}
+        r = post_json(url, payload)
+        print("[telegram]", r.status_code, r.text[:200])
+        ok = ok and r.ok
+    return ok
 
 def send_discord(text):
     hook = os.getenv("DISCORD_WEBHOOK_URL")
     if not hook:
         return False
-    payload = {"content": text}
-    r = requests.post(hook, json=payload, timeout=15)
-    print("[discord]", r.status_code, r.text[:200])
-    return r.ok
+    ok = True
+    for chunk in split_message(text, DISCORD_LIMIT):
+        r = post_json(hook, {"content": chunk})
+        print("[discord]", r.status_code, r.text[:200])
+        ok = ok and r.ok
+    return ok
 
-if __name__ == "__main__":
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--live-outdir", default="live_results")
-    ap.add_argument("--backtest-outdir", default="results")
-    ap.add_argument("--min-rows", type=int, default=1, help="Minimum rows to trigger an alert")
-    args = ap.parse_args()
-
-    live_df = read_csv_safe(os.path.join(args.live_outdir, "picks_live.csv"))
-    hist_df = read_csv_safe(os.path.join(args.backtest_outdir, "picks_final.csv"))
+def main(live_outdir="live_results", backtest_outdir="results", min_rows=1):
+    """Build the picks message and send it; returns True if any channel took it.
+    Importable so the pipeline can notify without spawning an interpreter."""
+    live_df = read_csv_safe(os.path.join(live_outdir, "picks_live.csv"))
+    hist_df = read_csv_safe(os.path.join(backtest_outdir, "picks_final.csv"))
 
     msg = []
     ts = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime())
@@ -85,12 +153,21 @@ if __name__ == "__main__":
     text = "\n".join(msg)
 
     total_rows = len(live_df) + len(hist_df)
-    if total_rows < args.min_rows:
+    if total_rows < min_rows:
         print("No alert sent (below min rows).")
         print(text)
-        raise SystemExit(0)
+        return False
 
     sent = send_telegram(text)
     sent |= send_discord(text)
     if not sent:
         print(text)  # fallback to stdout
+    return sent
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--live-outdir", default="live_results")
+    ap.add_argument("--backtest-outdir", default="results")
+    ap.add_argument("--min-rows", type=int, default=1, help="Minimum rows to trigger an alert")
+    args = ap.parse_args()
+    main(args.live_outdir, args.backtest_outdir, args.min_rows)
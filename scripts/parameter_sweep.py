@@ -2,9 +2,25 @@
 # -*- coding: utf-8 -*-
 """
 Grid-search MIN_EDGE × KELLY_SCALE using synthetic historical data.
-Outputs: results/sweep_results.csv
+Outputs: results/sweep_results.csv (+ sweep_results.parquet if pyarrow is installed)
 """
-import argparse, os, numpy as np, pandas as pd
+import argparse, os, sys, numpy as np, pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from csv_io import read_columns  # noqa: E402
+
+try:
+    from numba import njit, prange
+except ImportError:  # optional: the NumPy simulator is used instead
+    njit = None
+
+# only the columns the sweep reads (plus their aliases)
+USECOLS = {"odds", "price", "p", "p_model", "result"}
+DTYPES = {"odds": "float64", "price": "float64", "p": "float64", "p_model": "float64"}
+
+def read_data(path):
+    return read_columns(path, USECOLS.__contains__, DTYPES)
 
 ap = argparse.ArgumentParser()
 ap.add_argument("--data", default="results/tennis_data.csv")
@@ -12,10 +28,11 @@ ap.add_argument("--outdir", default="results")
 ap.add_argument("--edges", default="0.04,0.06,0.08,0.10")
 ap.add_argument("--kellys", default="0.25,0.5,0.75,1.0")
 ap.add_argument("--bankroll", type=float, default=1000.0)
+ap.add_argument("--seed", type=int, default=None, help="RNG seed for simulated results (when the data has no result column)")
 args = ap.parse_args()
 
 os.makedirs(args.outdir, exist_ok=True)
-df = pd.read_csv(args.data)
+df = read_data(args.data)
 if "odds" not in df.columns and "price" in df.columns:
     df["odds"] = df["price"]
 if "p" not in df.columns and "p_model" in df.columns:
@@ -25,41 +42,103 @@ edges = [float(x) for x in args.edges.split(",")]
 kellys = [float(x) for x in args.kellys.split(",")]
 
 def kelly_fraction(odds, p):
+    """Full-Kelly fraction clipped to [0, 1]; 0 where odds <= 1. Array-wise."""
     b = odds - 1.0
     q = 1 - p
-    if b <= 0: return 0.0
-    return max(0.0, min(1.0, (b*p - q) / b))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = np.where(b > 0, (b*p - q) / b, 0.0)
+    return np.clip(f, 0.0, 1.0)
+
+def simulate(odds, won, f, bankroll):
+    """Stake fraction f of the running bankroll on each pick in order.
+    Returns (final bankroll, peak bankroll, per-bet pnl)."""
+    growth = np.where(won, 1.0 + f * (odds - 1.0), 1.0 - f)
+    path = bankroll * np.cumprod(growth)
+    pnl = np.diff(path, prepend=bankroll)
+    return path[-1], max(bankroll, path.max()), pnl
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def simulate_grid(odds, won, f_base, kellys, bankroll):
+        """All Kelly scales in one pass each (parallel over scales): returns
+        per-scale final bankroll, peak bankroll and pnl std (Welford), with
+        no per-bet arrays allocated. won has one row per scale."""
+        n, m = odds.shape[0], kellys.shape[0]
+        final, peak, vol = np.empty(m), np.empty(m), np.empty(m)
+        for j in prange(m):
+            bank = pk = bankroll
+            mean = m2 = 0.0
+            for i in range(n):
+                f = min(max(f_base[i] * kellys[j], 0.0), 1.0)
+                new = bank * (1.0 + f * (odds[i] - 1.0)) if won[j, i] else bank * (1.0 - f)
+                d = new - bank
+                bank = new
+                pk = max(pk, bank)
+                delta = d - mean
+                mean += delta / (i + 1)
+                m2 += delta * (d - mean)
+            final[j], peak[j], vol[j] = bank, pk, np.sqrt(m2 / n)
+        return final, peak, vol
+else:
+    simulate_grid = None
+
+# compiling the kernel costs more than it saves on small grids
+JIT_MIN_WORK = 200_000
+
+# loop invariants: edge and full-Kelly fraction depend only on (odds, p)
+odds_all = df["odds"].to_numpy(dtype=float)
+p_all = df["p"].to_numpy(dtype=float)
+edge_vec = p_all - 1/odds_all
+f_base_all = kelly_fraction(odds_all, p_all)
+# NaN where a row has no settled result yet
+res_all = df["result"].to_numpy(dtype=float) if "result" in df.columns else None
+if res_all is not None and np.isnan(res_all).any():
+    print(f"{int(np.isnan(res_all).sum())} row(s) without a result; their outcomes are simulated")
+rng = np.random.default_rng(args.seed)
+
+# picks(e2) is a subset of picks(e1) for e2 > e1: walk the thresholds in
+# ascending order, filtering the previous threshold's (already gathered,
+# contiguous) arrays instead of rescanning the whole dataset. Row order is
+# kept because the bankroll path depends on it; once empty, it stays empty
+pick_sets = {}
+arrays = (edge_vec, odds_all, p_all, f_base_all) + ((res_all,) if res_all is not None else ())
+for e in sorted(set(edges)):
+    keep = arrays[0] >= e
+    arrays = tuple(a[keep] for a in arrays)
+    pick_sets[e] = arrays[1:]
 
 results = []
 for e in edges:
     # pick set
-    implied = 1/df["odds"]
-    picks = df[df["p"] - implied >= e].copy()
-    if picks.empty:
+    odds, p, f_base, *res = pick_sets[e]
+    n = len(odds)
+    if n == 0:
         results.append({"edge":e,"kelly":None,"n_bets":0,"roi":0,"final":args.bankroll,"max_dd":0,"score":-1})
         continue
+    # rows without a recorded result get one drawn outcome per edge, so every
+    # Kelly scale is simulated against the same realizations
+    if res and not np.isnan(res[0]).any():
+        won_e = res[0] == 1
+    else:
+        won_e = rng.random(n) < p
+        if res:
+            won_e = np.where(np.isnan(res[0]), won_e, res[0] == 1)
     # simulate once per Kelly
-    for k in kellys:
-        bank = args.bankroll
-        peak = bank
-        pnl = []
-        for _, r in picks.iterrows():
-            f = kelly_fraction(r["odds"], r["p"]) * k
-            f = min(max(f, 0.0), 1.0)
-            stake = bank * f
-            res = int(r["result"]) if "result" in r and str(r["result"]).strip() != "" else int(np.random.random() < r["p"])
-            if res == 1:
-                bank += stake * (r["odds"] - 1.0)
-                pnl.append(stake * (r["odds"] - 1.0))
-            else:
-                bank -= stake
-                pnl.append(-stake)
-            peak = max(peak, bank)
+    if simulate_grid is not None and n * len(kellys) >= JIT_MIN_WORK:
+        won = np.broadcast_to(won_e, (len(kellys), n))
+        runs = zip(*simulate_grid(odds, won, f_base, np.asarray(kellys, dtype=float), float(args.bankroll)))
+    else:
+        runs = []
+        for k in kellys:
+            f = np.clip(f_base * k, 0.0, 1.0)
+            bank, peak, pnl = simulate(odds, won_e, f, args.bankroll)
+            runs.append((bank, peak, np.std(pnl)))
+    for k, (bank, peak, vol) in zip(kellys, runs):
+        bank = float(bank)
         roi = (bank - args.bankroll)/max(args.bankroll,1)
         max_dd = (peak - bank)/max(peak,1)
-        vol = np.std(pnl) if pnl else 0.0
         score = roi / (vol+1e-9)  # crude risk-adjusted score
-        results.append({"edge":e,"kelly":k,"n_bets":len(picks),"roi":roi,"final":bank,"max_dd":max_dd,"score":score})
+        results.append({"edge":e,"kelly":k,"n_bets":n,"roi":roi,"final":bank,"max_dd":max_dd,"score":score})
 
 res = pd.DataFrame(results).sort_values(["score","roi"], ascending=[False,False])
 res["roi_pct"] = (res["roi"]*100).round(2)
@@ -67,5 +146,10 @@ res["max_dd_pct"] = (res["max_dd"]*100).round(2)
 out = os.path.join(args.outdir, "sweep_results.csv")
 res.to_csv(out, index=False)
 print(f"Wrote sweep grid -> {out}")
+# columnar copy for downstream readers; optional, needs pyarrow
+try:
+    res.to_parquet(out[:-len(".csv")] + ".parquet", engine="pyarrow", compression="zstd", index=False)
+except ImportError:
+    pass
 if not res.empty:
     print(res.head(10).to_string(index=False))
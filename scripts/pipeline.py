@@ -16,15 +16,25 @@ Design
 
 from __future__ import annotations
 import argparse
+import hashlib
 import json
 import os
+import runpy
+import shutil
 import subprocess
 import sys
+import threading
 import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime, timezone
 from pathlib import Path
 import csv
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from json_io import dumps  # noqa: E402
+
 # --------------------------------------------------------------------------------------
 # Repo paths
 # --------------------------------------------------------------------------------------
@@ -42,6 +52,9 @@ STATE_DIR = REPO_ROOT / "state"
 DOTSTATE  = REPO_ROOT / ".state"
 DOCS_DIR  = REPO_ROOT / "docs"
 
+PIPE_CACHE     = REPO_ROOT / ".cache" / "pipeline"
+PIPE_CACHE_MAX = 32  # entries kept (least recently used evicted)
+
 RUN_META     = RESULTS / "run_meta.json"
 METRICS_JSON = RESULTS / "metrics_config.json"
 
@@ -84,6 +97,9 @@ METRICS = {
     "MAX_MATCHES_PER_EVENT": 3,
 }
 
+# environment for every child step: built once, never mutated
+_BASE_CHILD_ENV = {**os.environ, **{k: str(v) for k, v in METRICS.items()}}
+
 # --------------------------------------------------------------------------------------
 # Helpers
 # --------------------------------------------------------------------------------------
@@ -91,9 +107,16 @@ def log(msg: str) -> None:
     ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
     print(f"[{ts}] {msg}", flush=True)
 
+_SEEN_DIRS: set[Path] = set()
+
 def ensure_dirs() -> None:
+    # one stat per existing dir; mkdir (and its parent walk) only when missing
     for p in [RESULTS, LIVE_RES, STATE_DIR, DOTSTATE, DOCS_DIR, RAW_DIR, ODDS_DIR, OUTPUTS]:
-        p.mkdir(parents=True, exist_ok=True)
+        if p in _SEEN_DIRS:
+            continue
+        if not p.is_dir():
+            p.mkdir(parents=True, exist_ok=True)
+        _SEEN_DIRS.add(p)
 
 def write_meta(mode: str, status: str = "ok", extra: dict | None = None) -> None:
     meta = {
@@ -106,38 +129,136 @@ def write_meta(mode: str, status: str = "ok", extra: dict | None = None) -> None
     if extra:
         meta.update(extra)
     RESULTS.mkdir(parents=True, exist_ok=True)
-    RUN_META.write_text(json.dumps(meta, indent=2))
+    RUN_META.write_text(dumps(meta), encoding="utf-8")
     log(f"meta → {RUN_META}")
 
 def dump_metrics() -> None:
-    METRICS_JSON.write_text(json.dumps(METRICS, indent=2))
+    METRICS_JSON.write_text(dumps(METRICS), encoding="utf-8")
     log("=== ACTIVE METRICS / PARAMETERS ===")
     for k, v in METRICS.items():
         log(f"{k} = {v}")
     log(f"metrics → {METRICS_JSON}")
 
+def _pump(src, dst) -> None:
+    for line in src:
+        dst.write(line)
+        dst.flush()
+    src.close()
+
+# opt-in (PIPELINE_INPROC=1): run python steps inside this already warm
+# interpreter. Off by default because an in-process step cannot be killed, so
+# the per-step timeout only holds on the subprocess path
+INPROC = os.getenv("PIPELINE_INPROC", "0") == "1"
+
+def _run_inproc(cmd: list[str], env: dict) -> None:
+    """Execute a script as __main__ in this process with its argv, cwd and
+    env swapped in; raises RuntimeError on a non-zero exit or an exception."""
+    saved_argv, saved_cwd, saved_env = sys.argv, os.getcwd(), os.environ.copy()
+    sys.argv = cmd[1:]
+    os.chdir(REPO_ROOT)
+    os.environ.update(env)
+    try:
+        runpy.run_path(cmd[1], run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            if not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+            raise RuntimeError(f"exit status {e.code}") from None
+    except Exception:
+        traceback.print_exc()
+        raise RuntimeError("raised") from None
+    finally:
+        sys.stdout.flush()
+        sys.argv = saved_argv
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+
 def run(cmd: list[str], timeout: int = 900, extra_env: dict | None = None):
-    env = os.environ.copy()
-    for k, v in METRICS.items():
-        env[k] = str(v)
-    if extra_env:
-        env.update({k: str(v) for k, v in extra_env.items()})
+    env = _BASE_CHILD_ENV if not extra_env else {**_BASE_CHILD_ENV, **{k: str(v) for k, v in extra_env.items()}}
 
     log(f"→ {cmd}")
     t0 = time.time()
-    proc = subprocess.run(
-        cmd, cwd=REPO_ROOT, capture_output=True, text=True, timeout=timeout, env=env
+    # argv/cwd/env are process-wide, so only a main thread runs steps
+    # in-process; the timeout does not apply there (hence opt-in)
+    if (INPROC and threading.current_thread() is threading.main_thread()
+            and len(cmd) > 1 and cmd[0] == PY and cmd[1].endswith(".py")):
+        try:
+            _run_inproc(cmd, env)
+        except RuntimeError as e:
+            dt = time.time() - t0
+            raise RuntimeError(f"Command failed ({dt:.1f}s, {e}): {' '.join(cmd)}") from None
+        log(f"✓ done in {time.time() - t0:.1f}s (in-process)")
+        return None
+    # stream child output line by line instead of buffering it all
+    proc = subprocess.Popen(
+        cmd, cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, bufsize=1, env=env,
     )
+    pumps = [
+        threading.Thread(target=_pump, args=(proc.stdout, sys.stdout), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, sys.stderr), daemon=True),
+    ]
+    for t in pumps:
+        t.start()
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        for t in pumps:
+            t.join()
     dt = time.time() - t0
-    if proc.stdout:
-        print(proc.stdout.rstrip())
     if proc.returncode != 0:
-        if proc.stderr:
-            print(proc.stderr.rstrip(), file=sys.stderr)
         raise RuntimeError(f"Command failed ({dt:.1f}s): {' '.join(cmd)}")
     log(f"✓ done in {dt:.1f}s")
     return proc
 
+# worker processes for concurrent steps: created on first use (backtest mode
+# never needs them) and reused across steps
+_POOL: ProcessPoolExecutor | None = None
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        # steps are mostly network-bound, so don't cap at the CPU count
+        _POOL = ProcessPoolExecutor(max_workers=min(8, (os.cpu_count() or 1) + 4))
+    return _POOL
+
+def _run_step(cmd: list[str], timeout: int) -> None:
+    run(cmd, timeout)  # result dropped: a Popen handle can't cross processes
+
+def run_dag(steps: dict[str, tuple[list[str], list[str]]], timeout: int = 900) -> None:
+    """Run {name: (cmd, deps)} on the worker pool, starting each step as soon
+    as its dependencies finish; raises the first failure."""
+    unknown = sorted({d for _, deps in steps.values() for d in deps} - steps.keys())
+    if unknown:
+        raise RuntimeError(f"run_dag: unknown dependencies {unknown}")
+    done: set[str] = set()
+    running = {}
+    pending = dict(steps)
+    while pending or running:
+        for name, (cmd, deps) in list(pending.items()):
+            if all(d in done for d in deps):
+                running[_pool().submit(_run_step, cmd, timeout)] = name
+                del pending[name]
+        if not running:
+            # nothing can start and nothing will finish: a dependency cycle
+            raise RuntimeError(f"run_dag: steps stuck on a dependency cycle: {sorted(pending)}")
+        # take every finished future before submitting more, so a failed
+        # sibling stops new work even if another future finished first
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        failed = [f for f in finished if f.exception() is not None]
+        if failed:
+            for f in running:
+                f.cancel()
+            wait(running)
+            raise failed[0].exception()
+        for f in finished:
+            done.add(running.pop(f))
+
 def csv_has_rows(path: Path) -> bool:
     if not path.exists() or path.stat().st_size == 0:
         return False
@@ -150,33 +271,85 @@ def csv_has_rows(path: Path) -> bool:
         return False
 
 def fresh_file(p: Path, max_age_min: int) -> bool:
-    if not p.exists():
+    try:
+        st = os.stat(p)
+    except FileNotFoundError:
         return False
-    age = time.time() - p.stat().st_mtime
+    age = time.time() - st.st_mtime
     return age <= max_age_min * 60
 
+def _file_digest(p: Path) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with p.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except FileNotFoundError:
+        return b"<missing>"
+    return h.digest()
+
+def cached_run(cmd: list[str], inputs: list[Path], outputs: list[Path],
+               extra_key: dict | None = None, **kw) -> None:
+    """Run a pure file-to-file step through a content-addressed cache: the key
+    covers the script source, its argv, the input bytes and extra_key (the
+    parameters it reads), so a hit just copies the stored outputs into place."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(Path(cmd[1]).read_bytes())
+    h.update("\0".join(cmd[2:]).encode("utf-8"))
+    for p in inputs:
+        h.update(_file_digest(p))
+    h.update(json.dumps(extra_key or {}, sort_keys=True).encode("utf-8"))
+    entry = PIPE_CACHE / h.hexdigest()
+    if entry.is_dir():
+        for o in outputs:
+            o.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry / o.name, o)
+        os.utime(entry)  # mark as recently used
+        log(f"↷ cached: {', '.join(o.name for o in outputs)} (skip {Path(cmd[1]).name})")
+        return
+    run(cmd, **kw)
+    # store via a temp dir + rename so a partial entry is never a hit
+    tmp = PIPE_CACHE / f".tmp-{entry.name}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for o in outputs:
+        shutil.copyfile(o, tmp / o.name)
+    os.replace(tmp, entry)
+    # LRU eviction by entry mtime
+    entries = sorted((e for e in PIPE_CACHE.iterdir() if not e.name.startswith(".")),
+                     key=lambda e: e.stat().st_mtime, reverse=True)
+    for old in entries[PIPE_CACHE_MAX:]:
+        shutil.rmtree(old, ignore_errors=True)
+
 # --------------------------------------------------------------------------------------
 # Steps: fetch
 # --------------------------------------------------------------------------------------
 def step_fetch_daily() -> None:
-    run([PY, str(SCRIPTS / "fetch_tennis_data.py"), "--outdir", str(RAW_DIR)])
-    run([
-        PY, str(SCRIPTS / "fetch_close_odds.py"),
-        "--outdir", str(ODDS_DIR),
-        "--odds", "oddsportal",
-    ])
+    # the two fetchers write separate files, so their network waits overlap
+    steps = {
+        "fetch_matches": ([PY, str(SCRIPTS / "fetch_tennis_data.py"), "--outdir", str(RAW_DIR)], []),
+        "fetch_odds": ([
+            PY, str(SCRIPTS / "fetch_close_odds.py"),
+            "--outdir", str(ODDS_DIR),
+            "--odds", "oddsportal",
+        ], []),
+    }
     if (SCRIPTS / "fill_with_synthetic_live.py").exists():
-        run([PY, str(SCRIPTS / "fill_with_synthetic_live.py"), "--outdir", str(ODDS_DIR)])
+        steps["fill_synth"] = ([PY, str(SCRIPTS / "fill_with_synthetic_live.py"), "--outdir", str(ODDS_DIR)], ["fetch_odds"])
+    run_dag(steps)
 
 def step_fetch_live() -> None:
-    run([PY, str(SCRIPTS / "fetch_live_matches.py"), "--outdir", str(RAW_DIR)])
-    run([
-        PY, str(SCRIPTS / "fetch_live_odds.py"),
-        "--outdir", str(ODDS_DIR),
-        "--odds", "oddsportal",
-    ])
+    steps = {
+        "fetch_matches": ([PY, str(SCRIPTS / "fetch_live_matches.py"), "--outdir", str(RAW_DIR)], []),
+        "fetch_odds": ([
+            PY, str(SCRIPTS / "fetch_live_odds.py"),
+            "--outdir", str(ODDS_DIR),
+            "--odds", "oddsportal",
+        ], []),
+    }
     if (SCRIPTS / "fill_with_synthetic_live.py").exists():
-        run([PY, str(SCRIPTS / "fill_with_synthetic_live.py"), "--outdir", str(ODDS_DIR)])
+        steps["fill_synth"] = ([PY, str(SCRIPTS / "fill_with_synthetic_live.py"), "--outdir", str(ODDS_DIR)], ["fetch_odds"])
+    run_dag(steps)
 
 # --------------------------------------------------------------------------------------
 # Steps: build/enrich
@@ -190,14 +363,19 @@ def step_build_dataset() -> None:
     if (SCRIPTS / "ensure_dataset.py").exists():
         run([PY, str(SCRIPTS / "ensure_dataset.py")])
 
-    run([
+    # pure file-to-file steps: served from the cache when inputs and
+    # parameters are unchanged
+    hist, vigfree = RAW_DIR / "historical_matches.csv", RAW_DIR / "vigfree_matches.csv"
+    vig_method = os.getenv("VIG_METHOD", "shin")
+    cached_run([
         PY, str(SCRIPTS / "compute_prob_vigfree.py"),
-        "--input",  str(RAW_DIR / "historical_matches.csv"),
-        "--output", str(RAW_DIR / "vigfree_matches.csv"),
-        "--method", os.getenv("VIG_METHOD", "shin"),
-    ])
+        "--input",  str(hist),
+        "--output", str(vigfree),
+        "--method", vig_method,
+    ], [hist], [vigfree], {"VIG_METHOD": vig_method})
 
-    run([PY, str(SCRIPTS / "check_probabilities.py")])
+    cached_run([PY, str(SCRIPTS / "check_probabilities.py")],
+               [vigfree], [OUTPUTS / "prob_enriched.csv"])
     run([PY, str(SCRIPTS / "edge_smith_enrich.py")])
     run([PY, str(SCRIPTS / "append_metrics.py")])
 
@@ -226,8 +404,13 @@ def step_outputs_and_notify() -> None:
     if (SCRIPTS / "make_dashboard.py").exists():
         run([PY, str(SCRIPTS / "make_dashboard.py")])
     if (SCRIPTS / "notify_picks.py").exists():
+        # in-process: no interpreter/pandas start-up for a few HTTP posts
         try:
-            run([PY, str(SCRIPTS / "notify_picks.py")], timeout=120)
+            if str(SCRIPTS) not in sys.path:
+                sys.path.insert(0, str(SCRIPTS))
+            import notify_picks
+            log("→ notify_picks (in-process)")
+            notify_picks.main(str(LIVE_RES), str(RESULTS), 1)
         except Exception as e:
             log(f"notify_picks soft-failed: {e}")
 
@@ -243,9 +426,14 @@ def step_state_rollup() -> None:
 
 def guard_daily_outputs() -> None:
     picks_csv = REPO_ROOT / "picks_live.csv"
-    if not picks_csv.exists():
+    # one stat for all checks (no window for the file to change in between)
+    try:
+        st = os.stat(picks_csv)
+    except FileNotFoundError:
         raise RuntimeError("picks_live.csv missing — engine did not write any file.")
-    if not fresh_file(picks_csv, 30):
+    if st.st_size == 0:
+        raise RuntimeError("picks_live.csv is empty — engine wrote no header.")
+    if time.time() - st.st_mtime > 30 * 60:
         raise RuntimeError("picks_live.csv is stale (>30 min).")
 
 # --------------------------------------------------------------------------------------
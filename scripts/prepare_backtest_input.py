@@ -9,6 +9,7 @@ This is a deterministic demo so that CI always places some bets.
 Replace this later with your real model that emits model_prob_* and edge_*.
 """
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 SRC = Path("data/raw/odds/sample_odds.csv")
@@ -18,7 +19,9 @@ def main():
     if not SRC.exists():
         raise FileNotFoundError(f"Missing input file: {SRC}")
 
-    df = pd.read_csv(SRC)
+    # all input columns are carried into the output, so only the odds get
+    # explicit dtypes (float64: the derived columns are written to 6 dp)
+    df = pd.read_csv(SRC, dtype={"odds_a": "float64", "odds_b": "float64"})
 
     # Sanity
     required = {"date","player_a","player_b","odds_a","odds_b"}
@@ -30,24 +33,18 @@ def main():
     implied_b = 1.0 / df["odds_b"]
 
     # Deterministic nudge pattern so some bets have +edge
-    nudges = [0.06, -0.03, -0.08, 0.02, 0.05, -0.07, -0.04, 0.09, 0.01, -0.05]
-    nudges = (nudges * ((len(df) // len(nudges)) + 1))[:len(df)]
+    nudges = np.array([0.06, -0.03, -0.08, 0.02, 0.05, -0.07, -0.04, 0.09, 0.01, -0.05])
+    nudges = np.tile(nudges, len(df) // len(nudges) + 1)[:len(df)]
 
-    model_prob_a = (implied_a + pd.Series(nudges)).clip(0.05, 0.95)
+    model_prob_a = (implied_a + nudges).clip(0.05, 0.95)
     model_prob_b = 1.0 - model_prob_a
 
     edge_a = model_prob_a - implied_a
     edge_b = model_prob_b - implied_b
 
-    # Synthetic ground-truth winner (for realized PnL in the demo)
-    winner = []
-    for pa in model_prob_a:
-        if pa >= 0.55:
-            winner.append("A")
-        elif pa <= 0.45:
-            winner.append("B")
-        else:
-            winner.append("A")
+    # Synthetic ground-truth winner (for realized PnL in the demo):
+    # B only when model_prob_a <= 0.45, otherwise A
+    winner = np.where(model_prob_a.to_numpy() <= 0.45, "B", "A")
 
     out = df.copy()
     out["implied_prob_a"] = implied_a.round(6)
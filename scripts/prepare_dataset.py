@@ -5,12 +5,9 @@ import pandas as pd
 import sys
 from pathlib import Path
 
-def normalize_implied(oa, ob):
-    # implied probabilities from decimal odds
-    ia = 1.0 / oa
-    ib = 1.0 / ob
-    s = ia + ib
-    return ia / s, ib / s
+# odds typed up front so the parser skips inference on them; every other
+# column is passed through to the output untouched
+DTYPES = {"oa": "float64", "ob": "float64"}
 
 def main():
     p = argparse.ArgumentParser()
@@ -26,11 +23,11 @@ def main():
     ]
     df = None
     if input_path.exists():
-        df = pd.read_csv(input_path)
+        df = pd.read_csv(input_path, dtype=DTYPES)
     else:
         for fp in fallback_paths:
             if fp.exists():
-                df = pd.read_csv(fp)
+                df = pd.read_csv(fp, dtype=DTYPES)
                 break
 
     if df is None:
@@ -42,17 +39,12 @@ def main():
         print("ERROR: need 'oa' and 'ob' columns to compute probabilities", file=sys.stderr)
         sys.exit(2)
 
-    df = df.copy()
-    df["oa"] = df["oa"].astype(float)
-    df["ob"] = df["ob"].astype(float)
-    pa_vals = []
-    pb_vals = []
-    for oa, ob in zip(df["oa"].values, df["ob"].values):
-        pa, pb = normalize_implied(oa, ob)
-        pa_vals.append(pa)
-        pb_vals.append(pb)
-    df["pa"] = pa_vals
-    df["pb"] = pb_vals
+    # implied probabilities from decimal odds, normalized to sum to 1
+    inv_a = 1.0 / df["oa"]
+    inv_b = 1.0 / df["ob"]
+    s = inv_a + inv_b
+    df["pa"] = inv_a / s
+    df["pb"] = inv_b / s
 
     out = Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
@@ -1,10 +1,22 @@
 #!/usr/bin/env python3
 # scripts/run_matrix_backtest.py
-import argparse, json
+import argparse, json, sys
 import pandas as pd
 from pathlib import Path
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).parent))
+
+from csv_io import read_columns  # noqa: E402
+
+# only what the model/picks need; numeric columns typed up front so the
+# parser skips inference
+USECOLS = {"oa", "ob", "pa", "player_a", "player_b"}
+DTYPES = {"oa": "float64", "ob": "float64", "pa": "float64"}
+
+def read_dataset(path):
+    return read_columns(path, USECOLS.__contains__, DTYPES)
+
 def parse_bands(s):
     # "1.0,2.0|2.0,3.0" -> list of (lo,hi)
     if not s:
@@ -17,12 +29,13 @@ def parse_bands(s):
     return bands
 
 def in_any_band(odds, bands):
+    """Boolean mask over an odds array: inside any inclusive (lo, hi) band."""
     if not bands:
-        return True
-    for lo,hi in bands:
-        if lo <= odds <= hi:
-            return True
-    return False
+        return np.ones(len(odds), dtype=bool)
+    los = np.array([lo for lo,_ in bands], dtype=float)
+    his = np.array([hi for _,hi in bands], dtype=float)
+    col = np.asarray(odds, dtype=float)[:, None]
+    return ((col >= los) & (col <= his)).any(axis=1)
 
 def main():
     ap = argparse.ArgumentParser()
@@ -35,58 +48,57 @@ def main():
     ap.add_argument("--outdir", default="results/backtests")
     args = ap.parse_args()
 
-    df = pd.read_csv(args.dataset)
+    df = read_dataset(args.dataset)
     bands = parse_bands(args.bands)
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    picks = []
-    bankroll = args.bankroll
-    start_bankroll = bankroll
+    start_bankroll = args.bankroll
 
     # deterministic "model": favorites (lower decimal odds) get slight positive bias
-    for _, row in df.iterrows():
-        oa = float(row["oa"])
-        ob = float(row["ob"])
-        implied_a = float(row.get("pa", 1.0/oa / (1.0/oa + 1.0/ob)))
-        implied_b = float(row.get("pb", 1.0/ob / (1.0/oa + 1.0/ob)))
-        # model probability: if A is favorite (oa < ob), add +0.05 else -0.05 (deterministic)
-        if oa < ob:
-            model_pa = min(0.99, implied_a + 0.05)
-        else:
-            model_pa = max(0.01, implied_a - 0.05)
-        edge = model_pa - implied_a
-
-        # choose candidate bet on A if edge >= min_edge and in bands
-        if edge >= args.min_edge and in_any_band(oa, bands):
-            # stake
-            if args.staking == "kelly":
-                # simple fractional rule: stake_fraction = kelly_scale * edge
-                stake_fraction = max(0.0, args.kelly_scale * edge)
-                stake = bankroll * stake_fraction
-            else:
-                stake = 1.0
-            stake = float(stake)
-            # outcome: assume actual result equals implied probability (i.e. random expectation), but to have deterministic PNL,
-            # we'll treat "win if model_pa > 0.5" for deterministic behavior
-            win = 1 if model_pa > 0.5 else 0
-            pnl = stake * ( (oa - 1.0) if win == 1 else -1.0 )
-            bankroll += pnl
-            picks.append({
-                "player_a": row.get("player_a", ""),
-                "player_b": row.get("player_b", ""),
-                "odds_a": oa,
-                "odds_b": ob,
-                "implied_a": implied_a,
-                "model_pa": model_pa,
-                "edge": edge,
-                "stake": stake,
-                "win": win,
-                "pnl": pnl,
-                "bankroll_after": bankroll
-            })
-
-    picks_df = pd.DataFrame(picks)
+    oa = df["oa"].to_numpy(dtype=float)
+    ob = df["ob"].to_numpy(dtype=float)
+    fair_a = 1.0/oa / (1.0/oa + 1.0/ob)
+    implied_a = df["pa"].to_numpy(dtype=float) if "pa" in df.columns else fair_a
+    # model probability: if A is favorite (oa < ob), add +0.05 else -0.05 (deterministic)
+    model_pa = np.where(oa < ob, np.minimum(0.99, implied_a + 0.05), np.maximum(0.01, implied_a - 0.05))
+    edge = model_pa - implied_a
+
+    # candidate bets on A: edge >= min_edge and in bands
+    take = (edge >= args.min_edge) & in_any_band(oa, bands)
+    oa_t, model_t, edge_t = oa[take], model_pa[take], edge[take]
+
+    # outcome: assume actual result equals implied probability (i.e. random expectation), but to have deterministic PNL,
+    # we'll treat "win if model_pa > 0.5" for deterministic behavior
+    win = (model_t > 0.5).astype(int)
+    ret = np.where(win == 1, oa_t - 1.0, -1.0)   # pnl per unit staked
+    if args.staking == "kelly":
+        # simple fractional rule: stake_fraction = kelly_scale * edge, so the
+        # bankroll compounds by (1 + fraction * ret) per bet
+        fraction = np.maximum(0.0, args.kelly_scale * edge_t)
+        bankroll_after = start_bankroll * np.cumprod(1.0 + fraction * ret)
+        stake = np.concatenate(([start_bankroll], bankroll_after[:-1])) * fraction
+    else:
+        stake = np.ones(len(oa_t))
+        bankroll_after = start_bankroll + np.cumsum(ret)
+    pnl = stake * ret
+    bankroll = float(bankroll_after[-1]) if len(bankroll_after) else start_bankroll
+
+    picks_df = pd.DataFrame()
+    if take.any():
+        picks_df = pd.DataFrame({
+            "player_a": df["player_a"].to_numpy()[take] if "player_a" in df.columns else "",
+            "player_b": df["player_b"].to_numpy()[take] if "player_b" in df.columns else "",
+            "odds_a": oa_t,
+            "odds_b": ob[take],
+            "implied_a": implied_a[take],
+            "model_pa": model_t,
+            "edge": edge_t,
+            "stake": stake,
+            "win": win,
+            "pnl": pnl,
+            "bankroll_after": bankroll_after,
+        })
     picks_out = outdir / "logs" / "picks_cfg1.csv"
     picks_out.parent.mkdir(parents=True, exist_ok=True)
     picks_df.to_csv(picks_out, index=False)
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "log_live_picks.py"
+
+
+def run_logger(picks, state_dir):
+    res = subprocess.run([sys.executable, str(SCRIPT), "--picks", str(picks), "--state-dir", str(state_dir)],
+                         capture_output=True, text=True, check=True)
+    return res.stdout
+
+
+def test_dedupe_against_pandas_formatted_log(tmp_path):
+    picks = tmp_path / "picks.csv"
+    picks.write_text("ts,match_id,selection,odds,p,edge\n"
+                     "2025-01-01 10:00,M1,A,2.10,0.60,0.26\n"
+                     "2025-01-01 10:00,M2,B,1.50,0.70,0.05\n", encoding="utf-8")
+    state = tmp_path / "state"
+    state.mkdir()
+    # a log as the old pandas writer left it: floats normalized ("2.1", "0.6")
+    pd.DataFrame([{"ts": "2025-01-01 10:00", "match_id": "M1", "selection": "A",
+                   "odds": 2.10, "p": 0.60, "edge": 0.26, "stake_eur": 50.0}]
+                 ).to_csv(state / "trade_log.csv", index=False)
+    assert "2.1," in (state / "trade_log.csv").read_text(encoding="utf-8")
+
+    out = run_logger(picks, state)
+    assert "skipped 1 duplicate rows" in out
+    assert "appended 1 row(s)" in out
+    log = pd.read_csv(state / "trade_log.csv")
+    assert sorted(log["match_id"]) == ["M1", "M2"]
+
+    # a second run over the same picks adds nothing
+    out = run_logger(picks, state)
+    assert "skipped 2 duplicate rows" in out
+    assert len(pd.read_csv(state / "trade_log.csv")) == 2